@@ -27,6 +27,9 @@ POLL_INTERVAL_SECONDS = 300  # 5 minutes
 # Database
 DB_PATH = os.path.join(os.path.dirname(__file__), "listings.db")
 
+# On-disk cache for conditional HTTP requests (ETag / Last-Modified)
+HTTP_CACHE_DIR = os.path.join(os.path.dirname(__file__), ".http_cache")
+
 # HTTP settings
 USER_AGENT = (
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
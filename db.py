@@ -1,57 +1,248 @@
 """
 SQLite database for tracking seen listings (deduplication).
 """
+import atexit
+import hashlib
 import sqlite3
+import threading
+import time
 from datetime import datetime
 from typing import Optional, Dict, List
 
 from config import DB_PATH
 
+# Single shared connection, opened lazily on first use. Opening a fresh
+# connection per call pays filesystem syscalls and a cold page cache every
+# time, which adds up when run_scan checks hundreds of listings per cycle.
+_conn: Optional[sqlite3.Connection] = None
+_conn_lock = threading.Lock()
+
+# The CREATE IF NOT EXISTS statements scan sqlite_master and commit; once
+# the schema exists they're pure overhead, so run them once per process
+# even if the connection is ever recreated.
+_schema_ready = False
+
+# In-memory cache of known normalized addresses. After the first few polls
+# almost every scanned listing is already in the database, so a set lookup
+# answers most dedup checks without touching SQLite at all.
+_seen_cache: set = set()
+_seen_cache_loaded = False
+
+
+def _load_seen_cache(conn: sqlite3.Connection) -> None:
+    """Populate the in-memory address cache once per process."""
+    global _seen_cache_loaded
+    if _seen_cache_loaded:
+        return
+    cursor = conn.execute("SELECT normalized_address FROM seen_listings")
+    _seen_cache.update(row["normalized_address"] for row in cursor.fetchall())
+    _seen_cache_loaded = True
+
 
 def get_connection() -> sqlite3.Connection:
-    """Get a database connection, creating tables if needed."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    _ensure_tables(conn)
-    return conn
+    """Get the shared database connection, creating tables if needed."""
+    global _conn, _schema_ready
+    with _conn_lock:
+        if _conn is None:
+            conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            # WAL keeps readers and the writer from blocking each other;
+            # synchronous=NORMAL is safe with WAL and skips an fsync per
+            # commit; mmap lets reads come from file-backed pages instead
+            # of read() syscalls. Applied once for the connection's life.
+            conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                PRAGMA temp_store=MEMORY;
+                PRAGMA mmap_size=268435456;
+                PRAGMA cache_size=-20000;
+            """)
+            if not _schema_ready:
+                _ensure_tables(conn)
+                _schema_ready = True
+            atexit.register(conn.close)
+            _conn = conn
+    return _conn
 
 
-def _ensure_tables(conn: sqlite3.Connection) -> None:
-    """Create tables if they don't exist."""
+def _addr_hash(normalized_address: str) -> int:
+    """
+    64-bit integer hash of a normalized address, used as the dedup key.
+
+    An 8-byte integer index is far more compact than the 40-80 byte
+    address strings, so lookups compare fixed-width ints and more index
+    entries fit per page. Masked to 63 bits to stay in SQLite's signed
+    INTEGER range.
+    """
+    digest = hashlib.blake2b(normalized_address.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & 0x7FFFFFFFFFFFFFFF
+
+
+_SEEN_LISTINGS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS seen_listings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        addr_hash INTEGER UNIQUE NOT NULL,
+        normalized_address TEXT NOT NULL,
+        original_address TEXT NOT NULL,
+        price INTEGER,
+        source TEXT NOT NULL,
+        url TEXT,
+        first_seen_at INTEGER NOT NULL,
+        last_seen_at INTEGER NOT NULL
+    )
+"""
+
+
+def _migrate_timestamps(conn: sqlite3.Connection) -> None:
+    """Convert ISO-string timestamps left by older versions to unix seconds."""
     conn.execute("""
-        CREATE TABLE IF NOT EXISTS seen_listings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            normalized_address TEXT UNIQUE NOT NULL,
-            original_address TEXT NOT NULL,
-            price INTEGER,
-            source TEXT NOT NULL,
-            url TEXT,
-            first_seen_at TEXT NOT NULL,
-            last_seen_at TEXT NOT NULL
-        )
+        UPDATE seen_listings
+        SET first_seen_at = CAST(strftime('%s', first_seen_at) AS INTEGER),
+            last_seen_at = CAST(strftime('%s', last_seen_at) AS INTEGER)
+        WHERE typeof(first_seen_at) = 'text'
     """)
+
+
+def _migrate_addr_hash(conn: sqlite3.Connection) -> None:
+    """Rebuild seen_listings with the addr_hash column for pre-existing DBs."""
+    conn.create_function("addr_hash", 1, _addr_hash, deterministic=True)
+    conn.execute("ALTER TABLE seen_listings RENAME TO seen_listings_old")
+    conn.execute(_SEEN_LISTINGS_SCHEMA)
     conn.execute("""
-        CREATE INDEX IF NOT EXISTS idx_normalized_address
-        ON seen_listings(normalized_address)
+        INSERT INTO seen_listings
+        (addr_hash, normalized_address, original_address, price, source, url,
+         first_seen_at, last_seen_at)
+        SELECT addr_hash(normalized_address), normalized_address,
+               original_address, price, source, url, first_seen_at, last_seen_at
+        FROM seen_listings_old
     """)
+    conn.execute("DROP TABLE seen_listings_old")
+
+
+def _ensure_tables(conn: sqlite3.Connection) -> None:
+    """Create tables if they don't exist, migrating older schemas."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(seen_listings)")}
+    conn.execute(_SEEN_LISTINGS_SCHEMA)
+    if columns and "addr_hash" not in columns:
+        _migrate_addr_hash(conn)
+    if columns:
+        _migrate_timestamps(conn)
     conn.execute("""
         CREATE INDEX IF NOT EXISTS idx_source
         ON seen_listings(source)
     """)
+    # Running per-source counters so get_stats doesn't have to scan the
+    # whole (ever-growing) seen_listings table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            source TEXT PRIMARY KEY,
+            n INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # Seed the counters from existing rows on first run with this schema
+    cursor = conn.execute("SELECT COUNT(*) FROM stats_counters")
+    if cursor.fetchone()[0] == 0:
+        conn.execute("""
+            INSERT INTO stats_counters (source, n)
+            SELECT source, COUNT(*) FROM seen_listings GROUP BY source
+        """)
     conn.commit()
 
 
+# Built once so every insert passes the identical SQL string; SQLite's
+# per-connection statement cache then reuses the compiled plan instead of
+# re-parsing the statement on each write.
+_INSERT_SQL = """
+    INSERT INTO seen_listings
+    (addr_hash, normalized_address, original_address, price, source, url, first_seen_at, last_seen_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(addr_hash) DO UPDATE SET
+        last_seen_at = excluded.last_seen_at,
+        price = excluded.price
+"""
+
+
+def _bump_counters(conn: sqlite3.Connection, counts: Dict[str, int]) -> None:
+    """Add per-source insert counts to the running stats counters."""
+    if not counts:
+        return
+    conn.executemany("""
+        INSERT INTO stats_counters (source, n) VALUES (?, ?)
+        ON CONFLICT(source) DO UPDATE SET n = n + excluded.n
+    """, list(counts.items()))
+
+
 def is_new_listing(normalized_address: str) -> bool:
     """Check if we've seen this listing before."""
+    if normalized_address in _seen_cache:
+        return False
+
+    # Cache miss: confirm against SQLite (covers writes from other processes)
+    conn = get_connection()
+    _load_seen_cache(conn)
+    if normalized_address in _seen_cache:
+        return False
+    cursor = conn.execute(
+        "SELECT 1 FROM seen_listings WHERE addr_hash = ?",
+        (_addr_hash(normalized_address),)
+    )
+    return cursor.fetchone() is None
+
+
+def filter_new(addresses: List[str]) -> List[str]:
+    """
+    Return the subset of normalized addresses not yet in the database.
+
+    Checks all addresses with chunked IN queries instead of one SELECT
+    per listing. Order of the input is preserved.
+    """
     conn = get_connection()
-    try:
+    _load_seen_cache(conn)
+
+    # The in-memory cache settles most addresses; only the remainder needs
+    # a query (to catch rows written by other processes).
+    candidates = [addr for addr in addresses if addr not in _seen_cache]
+
+    seen = set()
+    # SQLite caps bound parameters (999 by default), so chunk the IN clause.
+    for i in range(0, len(candidates), 900):
+        chunk = candidates[i:i + 900]
+        placeholders = ",".join("?" * len(chunk))
         cursor = conn.execute(
-            "SELECT 1 FROM seen_listings WHERE normalized_address = ?",
-            (normalized_address,)
+            f"SELECT normalized_address FROM seen_listings "
+            f"WHERE addr_hash IN ({placeholders})",
+            [_addr_hash(addr) for addr in chunk]
         )
-        return cursor.fetchone() is None
-    finally:
-        conn.close()
+        seen.update(row["normalized_address"] for row in cursor.fetchall())
+    _seen_cache.update(seen)
+    return [addr for addr in candidates if addr not in seen]
+
+
+def mark_many_as_seen(rows: List[tuple]) -> None:
+    """
+    Mark a batch of listings as seen in a single transaction.
+
+    Args:
+        rows: Tuples of (normalized_address, original_address, price,
+              source, url)
+    """
+    if not rows:
+        return
+
+    conn = get_connection()
+    _load_seen_cache(conn)
+
+    # Only rows we haven't seen count toward the stats counters
+    counts: Dict[str, int] = {}
+    for row in rows:
+        if row[0] not in _seen_cache:
+            counts[row[3]] = counts.get(row[3], 0) + 1
+
+    now = int(time.time())
+    conn.executemany(_INSERT_SQL, [(_addr_hash(row[0]),) + row + (now, now) for row in rows])
+    _bump_counters(conn, counts)
+    conn.commit()
+    _seen_cache.update(row[0] for row in rows)
 
 
 def mark_as_seen(
@@ -63,68 +254,55 @@ def mark_as_seen(
 ) -> None:
     """Mark a listing as seen in the database."""
     conn = get_connection()
-    now = datetime.utcnow().isoformat()
-    try:
-        conn.execute("""
-            INSERT INTO seen_listings
-            (normalized_address, original_address, price, source, url, first_seen_at, last_seen_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(normalized_address) DO UPDATE SET
-                last_seen_at = excluded.last_seen_at,
-                price = excluded.price
-        """, (normalized_address, original_address, price, source, url, now, now))
-        conn.commit()
-    finally:
-        conn.close()
+    _load_seen_cache(conn)
+    is_new = normalized_address not in _seen_cache
+    now = int(time.time())
+    conn.execute(_INSERT_SQL, (_addr_hash(normalized_address), normalized_address,
+                               original_address, price, source, url, now, now))
+    if is_new:
+        _bump_counters(conn, {source: 1})
+    conn.commit()
+    _seen_cache.add(normalized_address)
 
 
 def get_stats() -> Dict[str, int]:
     """Get database statistics."""
     conn = get_connection()
-    try:
-        # Total count
-        cursor = conn.execute("SELECT COUNT(*) as total FROM seen_listings")
-        total = cursor.fetchone()["total"]
-
-        # Count by source
-        cursor = conn.execute("""
-            SELECT source, COUNT(*) as count
-            FROM seen_listings
-            GROUP BY source
-            ORDER BY count DESC
-        """)
-        by_source = {row["source"]: row["count"] for row in cursor.fetchall()}
 
-        return {
-            "total": total,
-            "by_source": by_source
-        }
-    finally:
-        conn.close()
+    # Read the running counters instead of scanning the whole table
+    cursor = conn.execute("""
+        SELECT source, n FROM stats_counters ORDER BY n DESC
+    """)
+    by_source = {row["source"]: row["n"] for row in cursor.fetchall()}
+
+    return {
+        "total": sum(by_source.values()),
+        "by_source": by_source
+    }
 
 
 def get_recent_listings(limit: int = 10) -> List[Dict]:
     """Get the most recently seen listings."""
     conn = get_connection()
-    try:
-        cursor = conn.execute("""
-            SELECT original_address, price, source, url, first_seen_at
-            FROM seen_listings
-            ORDER BY first_seen_at DESC
-            LIMIT ?
-        """, (limit,))
-        return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
+    cursor = conn.execute("""
+        SELECT original_address, price, source, url, first_seen_at
+        FROM seen_listings
+        ORDER BY first_seen_at DESC
+        LIMIT ?
+    """, (limit,))
+    rows = [dict(row) for row in cursor.fetchall()]
+    # Timestamps are stored as unix seconds; format only for display
+    for row in rows:
+        row["first_seen_at"] = datetime.utcfromtimestamp(row["first_seen_at"]).isoformat()
+    return rows
 
 
 def clear_database() -> int:
     """Clear all listings from database. Returns count of deleted rows."""
     conn = get_connection()
-    try:
-        cursor = conn.execute("DELETE FROM seen_listings")
-        count = cursor.rowcount
-        conn.commit()
-        return count
-    finally:
-        conn.close()
+    cursor = conn.execute("DELETE FROM seen_listings")
+    count = cursor.rowcount
+    conn.execute("DELETE FROM stats_counters")
+    conn.commit()
+    _seen_cache.clear()
+    return count
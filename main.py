@@ -6,15 +6,15 @@ Orchestrates scraping from multiple sources, deduplication,
 and Telegram notifications for new rental listings.
 """
 import argparse
+import logging
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List
 
 from config import POLL_INTERVAL_SECONDS
-from models import Listing
-from db import is_new_listing, mark_as_seen, get_stats, get_recent_listings
-from notify import send_listing_with_photo, send_test_notification
+from db import filter_new, mark_many_as_seen, get_stats, get_recent_listings
+from notify import send_listing_batch, send_test_notification
 from scrapers import scrape_realtor, scrape_zillow, scrape_redfin
 
 
@@ -29,8 +29,8 @@ def run_scan() -> int:
     print(f"Rental Hunter Scan - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*60}\n")
 
-    all_listings: List[Listing] = []
     new_count = 0
+    total_found = 0
 
     # Scrape each source
     scrapers = [
@@ -39,38 +39,56 @@ def run_scan() -> int:
         ("Redfin", scrape_redfin),
     ]
 
-    for name, scraper_func in scrapers:
-        try:
-            listings = scraper_func()
-            print(f"  {name}: {len(listings)} listings")
-            all_listings.extend(listings)
-        except Exception as e:
-            print(f"  {name}: ERROR - {e}")
-
-    print(f"\nTotal listings found: {len(all_listings)}")
-
-    # Process listings (dedupe and notify)
-    for listing in all_listings:
-        normalized = listing.normalized_address
-
-        if is_new_listing(normalized):
-            print(f"\n  NEW: {listing.address} (${listing.price}/mo) [{listing.source}]")
-
-            # Send notification
-            if send_listing_with_photo(listing):
-                print(f"    -> Notification sent!")
-            else:
-                print(f"    -> Notification failed")
-
-            # Mark as seen
-            mark_as_seen(
-                normalized_address=normalized,
-                original_address=listing.address,
-                price=listing.price,
-                source=listing.source,
-                url=listing.url
-            )
-            new_count += 1
+    # The scrapers are network-bound, so run them concurrently; the scan
+    # takes as long as the slowest source instead of the sum of all three.
+    # Each source's results stream straight into the dedup dict as it
+    # finishes (sources often list the same property, so this collapses
+    # within-scan overlap without materializing a combined list).
+    by_address = {}
+    with ThreadPoolExecutor(max_workers=len(scrapers)) as executor:
+        futures = {
+            executor.submit(scraper_func): name
+            for name, scraper_func in scrapers
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                listings = future.result()
+                print(f"  {name}: {len(listings)} listings")
+                total_found += len(listings)
+                for listing in listings:
+                    by_address.setdefault(listing.normalized_address, listing)
+            except Exception as e:
+                print(f"  {name}: ERROR - {e}")
+
+    print(f"\nTotal listings found: {total_found}")
+
+    # One batched SELECT to classify everything, then a single transaction
+    # for the inserts, instead of a query + commit per listing.
+    new_listings = []
+    new_rows = []
+    for normalized in filter_new(list(by_address)):
+        listing = by_address[normalized]
+        print(f"\n  NEW: {listing.address} (${listing.price}/mo) [{listing.source}]")
+
+        new_listings.append(listing)
+        new_rows.append((
+            normalized,
+            listing.address,
+            listing.price,
+            listing.source,
+            listing.url,
+        ))
+        new_count += 1
+
+    # One batched notification pass instead of a round-trip per listing
+    if new_listings:
+        if send_listing_batch(new_listings):
+            print(f"\n  -> Notifications sent!")
+        else:
+            print(f"\n  -> Some notifications failed")
+
+    mark_many_as_seen(new_rows)
 
     print(f"\n{'='*60}")
     print(f"Scan complete. New listings: {new_count}")
@@ -135,6 +153,15 @@ def test_notifications():
 
 def main():
     """Main entry point."""
+    # The scrapers log through the logging module (cheaper than print
+    # when a level is filtered, and levels/handlers are configurable
+    # here in one place); the CLI output below stays on print.
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
     parser = argparse.ArgumentParser(
         description="Rental Hunter - Monitor rental listings and get notified"
     )
@@ -2,13 +2,51 @@
 Data models for Rental Hunter.
 """
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Optional
 
 
-@dataclass
+def to_int(value) -> Optional[int]:
+    """
+    Coerce a raw scraped field to int, or None if missing or malformed.
+
+    Replaces the ``int(x) if x else None`` pattern in the parsers: a
+    single bad field no longer aborts the whole listing parse with an
+    exception, and a legitimate 0 isn't silently dropped as falsy.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = value.replace(",", "")
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def to_float(value) -> Optional[float]:
+    """Coerce a raw scraped field to float, or None if missing or malformed."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = value.replace(",", "")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(slots=True, frozen=True)
 class Listing:
-    """Represents a rental listing from any source."""
+    """
+    Represents a rental listing from any source.
+
+    Slotted and frozen: a scan materializes hundreds of these per cycle,
+    and slots drop the per-instance __dict__ (~40% smaller objects with
+    faster attribute access); frozen keeps them hashable for set-based
+    cross-source dedup.
+    """
     address: str
     city: str
     state: str
@@ -20,6 +58,8 @@ class Listing:
     url: str
     source: str  # 'realtor', 'zillow', 'redfin'
     photo_url: Optional[str] = None
+    # Cached result of normalized_address, computed on first access
+    _normalized: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     @property
     def normalized_address(self) -> str:
@@ -27,7 +67,12 @@ class Listing:
         Normalize address for deduplication.
         Handles abbreviations, whitespace, case, etc.
         """
-        return normalize_address(self.address, self.city, self.state, self.zip_code)
+        if self._normalized is None:
+            # Bypass the frozen guard for the lazily-computed cache field
+            object.__setattr__(self, '_normalized', normalize_address(
+                self.address, self.city, self.state, self.zip_code
+            ))
+        return self._normalized
 
     def format_alert(self) -> str:
         """Format listing as a Telegram message."""
@@ -61,6 +106,55 @@ class Listing:
         return "\n".join(lines)
 
 
+# Token replacements for normalize_address: directional prefixes/suffixes,
+# street type abbreviations, and unit designations. Applied in a single
+# pass via one compiled alternation instead of ~30 separate re.sub calls.
+_ADDRESS_TOKENS = {
+    # Directions
+    'n': 'north',
+    's': 'south',
+    'e': 'east',
+    'w': 'west',
+    'ne': 'northeast',
+    'nw': 'northwest',
+    'se': 'southeast',
+    'sw': 'southwest',
+    # Street types
+    'st': 'street',
+    'str': 'street',
+    'ave': 'avenue',
+    'av': 'avenue',
+    'blvd': 'boulevard',
+    'dr': 'drive',
+    'rd': 'road',
+    'ln': 'lane',
+    'ct': 'court',
+    'cir': 'circle',
+    'pl': 'place',
+    'pkwy': 'parkway',
+    'pky': 'parkway',
+    'hwy': 'highway',
+    'ter': 'terrace',
+    'terr': 'terrace',
+    # Unit designations
+    'apt': 'unit',
+    'apartment': 'unit',
+    'ste': 'unit',
+    'suite': 'unit',
+}
+
+# Longest alternatives first so 'terr' wins over 'ter', etc.
+_TOKEN_RE = re.compile(
+    r'\b(' + '|'.join(sorted(map(re.escape, _ADDRESS_TOKENS), key=len, reverse=True)) + r')\b'
+)
+
+# One C-level translate pass handles the cheap cleanup: strip '.' and ',',
+# and rewrite '#' to a unit marker (the surrounding whitespace gets
+# collapsed by the split/join below)
+_CLEAN_TBL = str.maketrans({'#': ' unit ', '.': None, ',': None})
+
+
+@lru_cache(maxsize=4096)
 def normalize_address(address: str, city: str, state: str, zip_code: str) -> str:
     """
     Normalize an address for deduplication.
@@ -71,68 +165,10 @@ def normalize_address(address: str, city: str, state: str, zip_code: str) -> str
     - Whitespace normalization
     - Unit/apt number variations
     """
-    # Combine into full address
-    full = f"{address} {city} {state} {zip_code}"
-
-    # Lowercase
-    full = full.lower()
-
-    # Normalize whitespace
-    full = re.sub(r'\s+', ' ', full).strip()
-
-    # Remove punctuation except hyphens in unit numbers
-    full = re.sub(r'[.,#]', '', full)
-
-    # Standardize directional prefixes/suffixes
-    directions = {
-        r'\bn\b': 'north',
-        r'\bs\b': 'south',
-        r'\be\b': 'east',
-        r'\bw\b': 'west',
-        r'\bne\b': 'northeast',
-        r'\bnw\b': 'northwest',
-        r'\bse\b': 'southeast',
-        r'\bsw\b': 'southwest',
-    }
-    for pattern, replacement in directions.items():
-        full = re.sub(pattern, replacement, full)
-
-    # Standardize street type abbreviations
-    street_types = {
-        r'\bst\b': 'street',
-        r'\bstr\b': 'street',
-        r'\bave\b': 'avenue',
-        r'\bav\b': 'avenue',
-        r'\bblvd\b': 'boulevard',
-        r'\bdr\b': 'drive',
-        r'\brd\b': 'road',
-        r'\bln\b': 'lane',
-        r'\bct\b': 'court',
-        r'\bcir\b': 'circle',
-        r'\bpl\b': 'place',
-        r'\bpkwy\b': 'parkway',
-        r'\bpky\b': 'parkway',
-        r'\bhwy\b': 'highway',
-        r'\bter\b': 'terrace',
-        r'\bterr\b': 'terrace',
-        r'\bway\b': 'way',
-    }
-    for pattern, replacement in street_types.items():
-        full = re.sub(pattern, replacement, full)
-
-    # Standardize unit designations
-    unit_types = {
-        r'\bapt\b': 'unit',
-        r'\bapartment\b': 'unit',
-        r'\bste\b': 'unit',
-        r'\bsuite\b': 'unit',
-        r'\bunit\b': 'unit',
-        r'\b#': 'unit ',
-    }
-    for pattern, replacement in unit_types.items():
-        full = re.sub(pattern, replacement, full)
-
-    # Final whitespace cleanup
-    full = re.sub(r'\s+', ' ', full).strip()
-
-    return full
+    # Combine, casefold, strip punctuation, rewrite '#' -> unit marker,
+    # and collapse whitespace -- all in C-implemented str methods
+    full = f"{address} {city} {state} {zip_code}".casefold().translate(_CLEAN_TBL)
+    full = ' '.join(full.split())
+
+    # Expand all known abbreviations in one scan
+    return _TOKEN_RE.sub(lambda m: _ADDRESS_TOKENS[m.group(1)], full)
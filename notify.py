@@ -5,11 +5,71 @@ import json
 import urllib.request
 import urllib.parse
 import urllib.error
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
 from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_IDS, REQUEST_TIMEOUT
 from models import Listing
 
+# Shared opener so all Telegram calls go through one configured entry point.
+_OPENER = urllib.request.build_opener()
+
+_API_BASE = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+
+
+def _post(method: str, payload: dict) -> bool:
+    """
+    POST one JSON payload to a Telegram bot API method.
+
+    Returns:
+        True if the API reported ok, False on any error.
+    """
+    chat_id = payload.get("chat_id")
+    data = json.dumps(payload).encode("utf-8")
+
+    request = urllib.request.Request(
+        f"{_API_BASE}/{method}",
+        data=data,
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+
+    try:
+        with _OPENER.open(request, timeout=REQUEST_TIMEOUT) as response:
+            result = json.loads(response.read().decode("utf-8"))
+            if result.get("ok"):
+                return True
+            print(f"Telegram API error for {chat_id}: {result}")
+    except urllib.error.HTTPError as e:
+        print(f"Telegram HTTP error {e.code} for {chat_id}: {e.read().decode()}")
+    except urllib.error.URLError as e:
+        print(f"Telegram URL error for {chat_id}: {e.reason}")
+    except Exception as e:
+        print(f"Telegram error for {chat_id}: {e}")
+    return False
+
+
+def _fan_out(send_one) -> bool:
+    """
+    Run a per-chat send function across all configured chat IDs in parallel.
+
+    Telegram round-trips dominate the cost of notifying, so sending to N
+    chats concurrently takes ~1 RTT instead of N.
+
+    Returns:
+        True if at least one send succeeded.
+    """
+    if not TELEGRAM_CHAT_IDS:
+        print("No Telegram chat IDs configured")
+        return False
+
+    if len(TELEGRAM_CHAT_IDS) == 1:
+        return send_one(TELEGRAM_CHAT_IDS[0])
+
+    with ThreadPoolExecutor(max_workers=min(8, len(TELEGRAM_CHAT_IDS))) as executor:
+        results = list(executor.map(send_one, TELEGRAM_CHAT_IDS))
+    return sum(results) > 0
+
 
 def send_telegram_message(
     text: str,
@@ -27,45 +87,15 @@ def send_telegram_message(
     Returns:
         True if sent successfully to at least one recipient, False otherwise
     """
-    if not TELEGRAM_CHAT_IDS:
-        print("No Telegram chat IDs configured")
-        return False
-
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    success_count = 0
-
-    for chat_id in TELEGRAM_CHAT_IDS:
-        payload = {
+    def send_one(chat_id: str) -> bool:
+        return _post("sendMessage", {
             "chat_id": chat_id,
             "text": text,
             "parse_mode": parse_mode,
             "disable_web_page_preview": disable_web_page_preview,
-        }
-
-        data = json.dumps(payload).encode("utf-8")
-
-        request = urllib.request.Request(
-            url,
-            data=data,
-            headers={"Content-Type": "application/json"},
-            method="POST"
-        )
-
-        try:
-            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
-                result = json.loads(response.read().decode("utf-8"))
-                if result.get("ok"):
-                    success_count += 1
-                else:
-                    print(f"Telegram API error for {chat_id}: {result}")
-        except urllib.error.HTTPError as e:
-            print(f"Telegram HTTP error {e.code} for {chat_id}: {e.read().decode()}")
-        except urllib.error.URLError as e:
-            print(f"Telegram URL error for {chat_id}: {e.reason}")
-        except Exception as e:
-            print(f"Telegram error for {chat_id}: {e}")
-
-    return success_count > 0
+        })
+
+    return _fan_out(send_one)
 
 
 def send_listing_alert(listing: Listing) -> bool:
@@ -90,41 +120,15 @@ def send_photo_with_caption(
     Returns:
         True if sent successfully to at least one recipient, False otherwise
     """
-    if not TELEGRAM_CHAT_IDS:
-        print("No Telegram chat IDs configured")
-        return False
-
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
-    success_count = 0
-
-    for chat_id in TELEGRAM_CHAT_IDS:
-        payload = {
+    def send_one(chat_id: str) -> bool:
+        return _post("sendPhoto", {
             "chat_id": chat_id,
             "photo": photo_url,
             "caption": caption,
             "parse_mode": parse_mode,
-        }
-
-        data = json.dumps(payload).encode("utf-8")
-
-        request = urllib.request.Request(
-            url,
-            data=data,
-            headers={"Content-Type": "application/json"},
-            method="POST"
-        )
+        })
 
-        try:
-            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
-                result = json.loads(response.read().decode("utf-8"))
-                if result.get("ok"):
-                    success_count += 1
-                else:
-                    print(f"Telegram API error for {chat_id}: {result}")
-        except Exception as e:
-            print(f"Telegram photo error for {chat_id}: {e}")
-
-    return success_count > 0
+    return _fan_out(send_one)
 
 
 def send_listing_with_photo(listing: Listing) -> bool:
@@ -132,6 +136,11 @@ def send_listing_with_photo(listing: Listing) -> bool:
     Send a listing alert with photo if available.
     Falls back to text-only if photo fails.
     """
+    # Don't bother formatting the alert when it can't go anywhere
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_IDS:
+        print("Telegram not configured; skipping notification")
+        return False
+
     if listing.photo_url:
         caption = listing.format_alert()
         if send_photo_with_caption(listing.photo_url, caption):
@@ -142,6 +151,68 @@ def send_listing_with_photo(listing: Listing) -> bool:
     return send_listing_alert(listing)
 
 
+def send_listing_batch(listings: List[Listing]) -> bool:
+    """
+    Send alerts for a batch of new listings.
+
+    Listings with photos are grouped into sendMediaGroup calls (Telegram
+    caps media groups at 10 items), so a scan with 10 new listings costs
+    one API round-trip per chat instead of 10. Listings without photos,
+    and any chunk the API rejects, fall back to individual sends.
+
+    Returns:
+        True if every listing was delivered to at least one recipient.
+    """
+    if not listings:
+        return True
+
+    # Skip all the caption formatting when notifications are disabled
+    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_IDS:
+        print("Telegram not configured; skipping notifications")
+        return False
+
+    with_photo = [l for l in listings if l.photo_url]
+    without_photo = [l for l in listings if not l.photo_url]
+
+    def send_chunk(chunk: List[Listing]) -> bool:
+        # A one-item media group is just a worse sendPhoto
+        if len(chunk) == 1:
+            return send_listing_with_photo(chunk[0])
+
+        media = [
+            {
+                "type": "photo",
+                "media": l.photo_url,
+                "caption": l.format_alert(),
+                "parse_mode": "Markdown",
+            }
+            for l in chunk
+        ]
+
+        if _fan_out(lambda chat_id: _post("sendMediaGroup", {"chat_id": chat_id, "media": media})):
+            return True
+
+        # Group send failed; retry the chunk listing by listing
+        print("Media group send failed, falling back to individual sends")
+        return all([send_listing_with_photo(l) for l in chunk])
+
+    # Each media-group chunk and each photoless alert is an independent
+    # network round-trip, so run them all concurrently rather than one
+    # after another.
+    tasks = [lambda c=with_photo[i:i + 10]: send_chunk(c)
+             for i in range(0, len(with_photo), 10)]
+    tasks.extend(lambda l=l: send_listing_alert(l) for l in without_photo)
+
+    if not tasks:
+        return True
+    if len(tasks) == 1:
+        return tasks[0]()
+
+    with ThreadPoolExecutor(max_workers=min(8, len(tasks))) as executor:
+        results = [f.result() for f in [executor.submit(t) for t in tasks]]
+    return all(results)
+
+
 def send_test_notification() -> bool:
     """Send a test notification to verify Telegram is configured correctly."""
     message = (
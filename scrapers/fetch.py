@@ -0,0 +1,292 @@
+"""
+Shared HTTP fetch helpers for the scrapers.
+
+All scraper traffic goes through this module so the sources share one
+configured fetch path (headers, timeout, error handling) no matter which
+worker thread runs them. Connections are kept alive per thread and host,
+so repeat requests to the same site skip the TCP+TLS handshake.
+"""
+import hashlib
+import http.client
+import json
+import logging
+import os
+import ssl
+import threading
+import time
+import zlib
+from typing import Optional
+from urllib.parse import urlsplit
+
+try:
+    # Optional: C-accelerated JSON decoder, several times faster on the
+    # multi-megabyte API payloads. Its JSONDecodeError subclasses json's,
+    # so existing except clauses keep working.
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+from config import USER_AGENT, REQUEST_TIMEOUT, HTTP_CACHE_DIR
+
+log = logging.getLogger(__name__)
+
+BASE_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept-Language": "en-US,en;q=0.5",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+_SSL_CTX = ssl.create_default_context()
+
+# http.client connections aren't thread-safe, so pool them per thread.
+# Each scraper thread talks to one host repeatedly, which is exactly the
+# case keep-alive pays off for.
+_local = threading.local()
+
+
+def _get_conn(scheme: str, host: str) -> http.client.HTTPConnection:
+    """Get (or open) this thread's keep-alive connection to a host."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(host)
+    if conn is None:
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, timeout=REQUEST_TIMEOUT, context=_SSL_CTX)
+        else:
+            conn = http.client.HTTPConnection(host, timeout=REQUEST_TIMEOUT)
+        conns[host] = conn
+    return conn
+
+
+def _decompress(body: bytes, response) -> bytes:
+    """Undo the Content-Encoding the request advertised, if any."""
+    encoding = response.getheader("Content-Encoding")
+    if encoding == "gzip":
+        return zlib.decompress(body, 31)  # wbits=31: gzip wrapper
+    if encoding == "deflate":
+        return zlib.decompress(body, -15)  # raw deflate stream
+    return body
+
+
+def _raw_get(url: str, headers: dict, max_redirects: int = 3):
+    """
+    GET a URL over the thread's pooled connection.
+
+    Follows up to max_redirects redirects and transparently decompresses
+    the body. Returns (status, body bytes, response object) -- the
+    response is already fully read; it's passed back so callers can
+    inspect headers. Raises on transport errors.
+    """
+    for _ in range(max_redirects + 1):
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        conn = _get_conn(parts.scheme, parts.netloc)
+
+        # Retry once on a stale keep-alive socket the server closed
+        for attempt in (0, 1):
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError, OSError):
+                conn.close()
+                if attempt:
+                    raise
+                conn = _get_conn(parts.scheme, parts.netloc)
+
+        if response.status in (301, 302, 303, 307, 308):
+            location = response.getheader("Location")
+            if not location:
+                return response.status, _decompress(body, response), response
+            if location.startswith("/"):
+                location = f"{parts.scheme}://{parts.netloc}{location}"
+            url = location
+            continue
+
+        return response.status, _decompress(body, response), response
+
+    return response.status, _decompress(body, response), response
+
+
+# --- In-process TTL memo ---------------------------------------------------
+# Short-lived memo of successful fetch results, keyed by URL. Within a
+# scan the same URL can be requested more than once (overlapping
+# fallback paths, retried sources); those repeats are answered from
+# memory without a network round-trip. Entries expire after the poll
+# interval so loop mode always sees fresh pages.
+
+_MEMO_TTL = 300.0  # seconds; matches POLL_INTERVAL_SECONDS
+_memo: dict = {}  # (kind, url) -> (expiry deadline, result)
+_memo_lock = threading.Lock()
+
+
+def _memo_get(kind: str, url: str):
+    with _memo_lock:
+        entry = _memo.get((kind, url))
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _memo[(kind, url)]
+            return None
+        return entry[1]
+
+
+def _memo_put(kind: str, url: str, result) -> None:
+    with _memo_lock:
+        _memo[(kind, url)] = (time.monotonic() + _MEMO_TTL, result)
+
+
+# --- Conditional-GET cache -------------------------------------------------
+# Pages that send ETag/Last-Modified validators get cached on disk; the
+# next fetch revalidates with If-None-Match/If-Modified-Since and a 304
+# answer is served from the cached body, skipping the multi-megabyte
+# transfer. Cache trouble (missing dir, corrupt file) silently degrades
+# to a normal fetch.
+
+def _cache_key(url: str) -> str:
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _cache_read_meta(key: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(HTTP_CACHE_DIR, key + ".json"), "rb") as fh:
+            return json.loads(fh.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_read_body(key: str) -> Optional[bytes]:
+    try:
+        with open(os.path.join(HTTP_CACHE_DIR, key + ".body"), "rb") as fh:
+            return fh.read()
+    except OSError:
+        return None
+
+
+def _cache_write(key: str, etag: Optional[str], last_modified: Optional[str],
+                 body: bytes) -> None:
+    try:
+        os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+        with open(os.path.join(HTTP_CACHE_DIR, key + ".body"), "wb") as fh:
+            fh.write(body)
+        with open(os.path.join(HTTP_CACHE_DIR, key + ".json"), "w") as fh:
+            json.dump({"etag": etag, "last_modified": last_modified}, fh)
+    except OSError:
+        pass
+
+
+def fetch_bytes(url: str, label: str, headers: Optional[dict] = None) -> Optional[bytes]:
+    """
+    Fetch a page and return its raw body bytes, or None on error.
+
+    Scrapers work on the bytes directly and decode only the small
+    fragments they extract, instead of transcoding megabytes of HTML
+    up front. Responses with cache validators are revalidated with a
+    conditional GET on later fetches of the same URL.
+
+    Args:
+        url: Page URL
+        label: Source name used to prefix log output (e.g. 'Realtor')
+        headers: Extra headers merged over the defaults
+    """
+    memoized = _memo_get("page", url)
+    if memoized is not None:
+        return memoized
+
+    merged = dict(BASE_HEADERS)
+    merged["Accept"] = "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+    if headers:
+        merged.update(headers)
+
+    key = _cache_key(url)
+    meta = _cache_read_meta(key)
+    if meta:
+        if meta.get("etag"):
+            merged["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            merged["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        status, body, response = _raw_get(url, merged)
+
+        if status == 304:
+            cached = _cache_read_body(key)
+            if cached is not None:
+                _memo_put("page", url, cached)
+                return cached
+            # Validators survived but the body file didn't; refetch plain
+            merged.pop("If-None-Match", None)
+            merged.pop("If-Modified-Since", None)
+            status, body, response = _raw_get(url, merged)
+    except Exception as e:
+        log.warning("[%s] Fetch error: %s", label, e)
+        return None
+
+    if status != 200:
+        log.warning("[%s] HTTP error %s", label, status)
+        return None
+
+    etag = response.getheader("ETag")
+    last_modified = response.getheader("Last-Modified")
+    if etag or last_modified:
+        _cache_write(key, etag, last_modified, body)
+
+    _memo_put("page", url, body)
+    return body
+
+
+def fetch_page(url: str, label: str, headers: Optional[dict] = None) -> Optional[str]:
+    """Fetch a page and return its decoded HTML content, or None on error."""
+    body = fetch_bytes(url, label, headers)
+    if body is None:
+        return None
+    return body.decode("utf-8", errors="replace")
+
+
+def fetch_api(url: str, label: str, headers: Optional[dict] = None) -> Optional[dict]:
+    """
+    Fetch a JSON API endpoint and return the parsed response, or None on error.
+
+    Args:
+        url: API URL
+        label: Source name used to prefix log output
+        headers: Extra headers merged over the defaults
+    """
+    memoized = _memo_get("api", url)
+    if memoized is not None:
+        return memoized
+
+    merged = dict(BASE_HEADERS)
+    merged["Accept"] = "application/json"
+    if headers:
+        merged.update(headers)
+
+    try:
+        status, body, _ = _raw_get(url, merged)
+    except Exception as e:
+        log.warning("[%s] Fetch error: %s", label, e)
+        return None
+
+    if status != 200:
+        log.warning("[%s] HTTP error %s", label, status)
+        return None
+
+    # Some APIs (Redfin) prefix responses with "{}&&" as an
+    # anti-hijacking guard; strip it before parsing. json.loads accepts
+    # the raw bytes, so no up-front decode of the whole body is needed.
+    if body.startswith(b"{}&&"):
+        body = body[4:]
+
+    try:
+        data = json_loads(body)
+    except json.JSONDecodeError as e:
+        log.warning("[%s] JSON parse error: %s", label, e)
+        return None
+
+    _memo_put("api", url, data)
+    return data
@@ -2,20 +2,42 @@
 Realtor.com scraper for rental listings.
 Parses the __NEXT_DATA__ JSON embedded in the page.
 """
+import io
 import json
+import logging
 import re
-import urllib.request
-import urllib.error
-from typing import List, Optional
-
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from config import (
-    LOCATION_SLUG, MIN_SQFT, MAX_RENT, USER_AGENT, REQUEST_TIMEOUT
-)
-from models import Listing
+from typing import Iterator, List, Optional
+
+try:
+    # Optional: stream-parses only the properties subtree out of the big
+    # __NEXT_DATA__ blob instead of materializing the whole state dict
+    import ijson
+except ImportError:
+    ijson = None
+
+from config import LOCATION_SLUG, MIN_SQFT, MAX_RENT
+from models import Listing, to_float, to_int
+from scrapers.fetch import fetch_bytes, json_loads
+
+log = logging.getLogger(__name__)
+
+# Compiled once at import; these run against every page (and every card in
+# the HTML fallback), so skip the re-cache lookup per call. The card
+# patterns are bytes patterns: the page is scanned undecoded and only the
+# matched fragments are decoded.
+_ADDR_RE = re.compile(rb'data-testid="card-address[^"]*"[^>]*>([^<]+)')
+_PRICE_RE = re.compile(rb'\$([0-9,]+)')
+_URL_RE = re.compile(rb'href="(/realestateandhomes-detail/[^"]+)"')
+# Runs on the short, already-decoded address fragment, so it stays a str pattern
+_ZIP_RE = re.compile(r'(\d{5})')
+
+# Maps every ASCII character that isn't slug-safe ([a-z0-9]) to '-' in one
+# C-level translate pass; dash runs are then collapsed by split/join.
+# Replaces two regex substitutions per constructed detail URL.
+_SLUG_TBL = str.maketrans({
+    chr(c): '-' for c in range(128)
+    if not ('a' <= chr(c) <= 'z' or '0' <= chr(c) <= '9')
+})
 
 
 def scrape_realtor() -> List[Listing]:
@@ -36,72 +58,101 @@ def scrape_realtor() -> List[Listing]:
         f"/sqft-{MIN_SQFT}-na"
     )
 
-    print(f"[Realtor] Fetching: {url}")
+    log.info("[Realtor] Fetching: %s", url)
 
     try:
-        html = _fetch_page(url)
+        html = fetch_bytes(url, "Realtor")
         if not html:
-            print("[Realtor] Failed to fetch page")
+            log.warning("[Realtor] Failed to fetch page")
             return listings
 
         # Try to extract __NEXT_DATA__ JSON
-        data = _extract_next_data(html)
-        if data:
-            listings = _parse_next_data(data)
-            print(f"[Realtor] Found {len(listings)} listings via __NEXT_DATA__")
+        blob = _extract_next_data(html)
+        if blob:
+            listings = _parse_next_blob(blob)
+            log.info("[Realtor] Found %d listings via __NEXT_DATA__", len(listings))
         else:
             # Fallback: try to parse HTML directly
-            listings = _parse_html_fallback(html)
-            print(f"[Realtor] Found {len(listings)} listings via HTML fallback")
+            listings = list(_parse_html_fallback(html))
+            log.info("[Realtor] Found %d listings via HTML fallback", len(listings))
 
     except Exception as e:
-        print(f"[Realtor] Error: {e}")
+        log.error("[Realtor] Error: %s", e)
 
     return listings
 
 
-def _fetch_page(url: str) -> Optional[str]:
-    """Fetch a page and return its HTML content."""
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-    }
-
-    request = urllib.request.Request(url, headers=headers)
-
-    try:
-        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
-            return response.read().decode("utf-8", errors="replace")
-    except urllib.error.HTTPError as e:
-        print(f"[Realtor] HTTP error {e.code}")
-        return None
-    except urllib.error.URLError as e:
-        print(f"[Realtor] URL error: {e.reason}")
+def _extract_next_data(html: bytes) -> Optional[bytes]:
+    """Extract the raw __NEXT_DATA__ JSON blob from the page."""
+    # The script tag is unique in the page, so three linear find calls
+    # locate the blob far faster than a DOTALL regex scan over megabytes
+    # of HTML
+    i = html.find(b'<script id="__NEXT_DATA__"')
+    if i < 0:
         return None
-    except Exception as e:
-        print(f"[Realtor] Fetch error: {e}")
+    j = html.find(b'>', i)
+    k = html.find(b'</script>', j)
+    if j < 0 or k < 0:
         return None
+    return html[j + 1:k]
 
 
-def _extract_next_data(html: str) -> Optional[dict]:
-    """Extract the __NEXT_DATA__ JSON from the page."""
-    pattern = r'<script id="__NEXT_DATA__"[^>]*>(.*?)</script>'
-    match = re.search(pattern, html, re.DOTALL)
+# JSONPath prefixes where the properties array has been observed; these
+# mirror the probe order in _parse_next_data
+_PROPERTY_PATHS = (
+    "props.pageProps.properties.item",
+    "props.pageProps.searchResults.home_search.properties.item",
+    "props.pageProps.searchResults.properties.item",
+    "props.pageProps.pageData.searchResults.properties.item",
+)
 
-    if match:
-        try:
-            return json.loads(match.group(1))
-        except json.JSONDecodeError as e:
-            print(f"[Realtor] JSON parse error: {e}")
-            return None
-    return None
+# The path that matched last time. The page layout doesn't change between
+# polls, so in loop mode every scan after the first hits on the first probe
+# instead of streaming the blob once per miss.
+_last_good_path: Optional[str] = None
 
 
-def _parse_next_data(data: dict) -> List[Listing]:
-    """Parse listings from __NEXT_DATA__ structure."""
-    listings = []
+def _parse_next_blob(blob: bytes) -> List[Listing]:
+    """
+    Parse listings from a raw __NEXT_DATA__ JSON blob.
+
+    With ijson available, only the properties subtree is materialized;
+    the rest of the blob (redux state, i18n strings, analytics) is
+    streamed past. Falls back to a full json.loads otherwise. Either
+    way the blob is consumed as bytes, never decoded wholesale.
+    """
+    global _last_good_path
+    if ijson is not None:
+        paths = _PROPERTY_PATHS
+        if _last_good_path is not None:
+            paths = (_last_good_path,) + tuple(
+                p for p in _PROPERTY_PATHS if p != _last_good_path
+            )
+        for path in paths:
+            listings = []
+            try:
+                for prop in ijson.items(io.BytesIO(blob), path):
+                    listing = _parse_property(prop)
+                    if listing:
+                        listings.append(listing)
+            except Exception:
+                continue
+            if listings:
+                _last_good_path = path
+                return listings
+        # Nothing at any known path; fall through to the full parse, which
+        # also reports JSON errors
 
+    try:
+        data = json_loads(blob)
+    except json.JSONDecodeError as e:
+        log.warning("[Realtor] JSON parse error: %s", e)
+        return []
+    return list(_parse_next_data(data))
+
+
+def _parse_next_data(data: dict) -> Iterator[Listing]:
+    """Yield listings parsed from the __NEXT_DATA__ structure."""
     try:
         # Navigate to the listings in the data structure
         # This path may change if Realtor.com updates their structure
@@ -130,18 +181,16 @@ def _parse_next_data(data: dict) -> List[Listing]:
                 search_results = pd["searchResults"].get("properties", [])
 
         if not search_results:
-            print("[Realtor] Could not find listings in __NEXT_DATA__")
-            return listings
+            log.warning("[Realtor] Could not find listings in __NEXT_DATA__")
+            return
 
         for prop in search_results:
             listing = _parse_property(prop)
             if listing:
-                listings.append(listing)
+                yield listing
 
     except Exception as e:
-        print(f"[Realtor] Parse error: {e}")
-
-    return listings
+        log.warning("[Realtor] Parse error: %s", e)
 
 
 def _parse_property(prop: dict) -> Optional[Listing]:
@@ -184,9 +233,8 @@ def _parse_property(prop: dict) -> Optional[Listing]:
             url = f"https://www.realtor.com/realestateandhomes-detail/{property_id}"
         else:
             # Construct from address
-            slug = f"{street}-{city}-{state}-{zip_code}".lower()
-            slug = re.sub(r'[^a-z0-9-]', '-', slug)
-            slug = re.sub(r'-+', '-', slug)
+            slug = f"{street}-{city}-{state}-{zip_code}".lower().translate(_SLUG_TBL)
+            slug = '-'.join(part for part in slug.split('-') if part)
             url = f"https://www.realtor.com/realestateandhomes-detail/{slug}"
 
         # Get photo
@@ -198,56 +246,66 @@ def _parse_property(prop: dict) -> Optional[Listing]:
             primary_photo = prop.get("primary_photo", {})
             photo_url = primary_photo.get("href")
 
-        return Listing(
-            address=street,
-            city=city,
-            state=state,
-            zip_code=zip_code,
-            price=int(list_price),
-            bedrooms=int(beds) if beds else None,
-            bathrooms=float(baths) if baths else None,
-            sqft=int(sqft) if sqft else None,
-            url=url,
-            source="realtor",
-            photo_url=photo_url
-        )
+        # Positional args in Listing field order; skips the per-call
+        # keyword matching in the hot parse loop
+        return Listing(street, city, state, zip_code, int(list_price),
+                       to_int(beds), to_float(baths), to_int(sqft),
+                       url, "realtor", photo_url)
 
     except Exception as e:
-        print(f"[Realtor] Property parse error: {e}")
+        log.warning("[Realtor] Property parse error: %s", e)
         return None
 
 
-def _parse_html_fallback(html: str) -> List[Listing]:
+# Marks the start of each property card in the fallback HTML; may need
+# updating if Realtor.com changes their markup
+_CARD_ANCHOR = b'data-testid="property-card"'
+
+
+def _iter_cards(html: bytes, limit: int = 20):
     """
-    Fallback HTML parser when __NEXT_DATA__ isn't available.
-    This is less reliable but provides some coverage.
+    Yield a card-sized slice of the page for each property card anchor.
+
+    Replaces a DOTALL regex over the whole page, which backtracks badly
+    on large inputs, with two linear find calls per card. Each slice
+    runs to the next anchor (or a fixed cap for the last card), which is
+    plenty of context for the small per-field regexes.
     """
-    listings = []
+    pos = html.find(_CARD_ANCHOR)
+    count = 0
+    while pos >= 0 and count < limit:
+        nxt = html.find(_CARD_ANCHOR, pos + len(_CARD_ANCHOR))
+        end = nxt if nxt >= 0 else min(len(html), pos + 8192)
+        yield html[pos:end]
+        pos = nxt
+        count += 1
 
-    # Look for property cards in the HTML
-    # This pattern may need updating if Realtor.com changes their markup
-    card_pattern = r'data-testid="property-card"[^>]*>(.*?)</div>\s*</div>\s*</div>'
-    cards = re.findall(card_pattern, html, re.DOTALL)
 
-    for card in cards[:20]:  # Limit to first 20
+def _parse_html_fallback(html: bytes) -> Iterator[Listing]:
+    """
+    Fallback HTML parser when __NEXT_DATA__ isn't available.
+    This is less reliable but provides some coverage. Yields listings
+    as cards parse; the caller materializes at the boundary.
+    """
+    for card in _iter_cards(html):
         try:
             # Extract address
-            addr_match = re.search(r'data-testid="card-address[^"]*"[^>]*>([^<]+)', card)
+            addr_match = _ADDR_RE.search(card)
             if not addr_match:
                 continue
 
-            address_text = addr_match.group(1).strip()
+            address_text = addr_match.group(1).decode("utf-8", errors="replace").strip()
 
             # Extract price
-            price_match = re.search(r'\$([0-9,]+)', card)
+            price_match = _PRICE_RE.search(card)
             if not price_match:
                 continue
 
-            price = int(price_match.group(1).replace(',', ''))
+            price = int(price_match.group(1).replace(b',', b''))
 
             # Extract URL
-            url_match = re.search(r'href="(/realestateandhomes-detail/[^"]+)"', card)
-            url = f"https://www.realtor.com{url_match.group(1)}" if url_match else ""
+            url_match = _URL_RE.search(card)
+            url = f"https://www.realtor.com{url_match.group(1).decode('ascii', errors='replace')}" if url_match else ""
 
             # Parse address components (basic)
             parts = address_text.split(',')
@@ -258,25 +316,12 @@ def _parse_html_fallback(html: str) -> List[Listing]:
 
             if len(parts) >= 2:
                 city_state = parts[-1].strip()
-                zip_match = re.search(r'(\d{5})', city_state)
+                zip_match = _ZIP_RE.search(city_state)
                 if zip_match:
                     zip_code = zip_match.group(1)
 
-            listings.append(Listing(
-                address=street,
-                city=city,
-                state=state,
-                zip_code=zip_code,
-                price=price,
-                bedrooms=None,
-                bathrooms=None,
-                sqft=None,
-                url=url,
-                source="realtor",
-                photo_url=None
-            ))
-
-        except Exception as e:
-            continue
+            yield Listing(street, city, state, zip_code, price,
+                          None, None, None, url, "realtor", None)
 
-    return listings
+        except Exception:
+            continue
@@ -3,20 +3,26 @@ Redfin scraper for rental listings.
 Uses the Redfin stingray GIS API.
 """
 import json
+import logging
 import re
-import urllib.request
 import urllib.parse
-import urllib.error
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
 
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import MIN_SQFT, MAX_RENT
+from models import Listing, to_float, to_int
+from scrapers.fetch import fetch_api, fetch_bytes, json_loads
 
-from config import (
-    MIN_SQFT, MAX_RENT, USER_AGENT, REQUEST_TIMEOUT
-)
-from models import Listing
+log = logging.getLogger(__name__)
+
+# Compiled once at import; these run against every fallback page and card.
+# The card patterns are bytes patterns: the page is scanned undecoded and
+# only the matched fragments are decoded.
+_ADDR_RE = re.compile(rb'class="[^"]*homeAddress[^"]*"[^>]*>([^<]+)', re.IGNORECASE)
+_PRICE_RE = re.compile(rb'\$([0-9,]+)')
+_URL_RE = re.compile(rb'href="(/FL/[^"]+)"')
+# Runs on the short, already-decoded address fragment, so it stays a str pattern
+_ZIP_RE = re.compile(r'(\d{5})')
 
 
 # St. Petersburg, FL bounding box (approximate)
@@ -31,6 +37,10 @@ ST_PETE_BOUNDS = {
 ST_PETE_REGION_ID = 17193
 ST_PETE_REGION_TYPE = 6  # City
 
+# GIS pages fetched per scan (100 homes each). Fetched concurrently, so
+# the extra pages cost one round-trip, not four.
+GIS_PAGE_COUNT = 4
+
 
 def scrape_redfin() -> List[Listing]:
     """
@@ -41,34 +51,34 @@ def scrape_redfin() -> List[Listing]:
     """
     listings = []
 
-    print("[Redfin] Fetching listings...")
+    log.info("[Redfin] Fetching listings...")
 
     try:
-        # Try the GIS API first (most reliable)
-        listings = _scrape_via_gis_api()
-        if listings:
-            print(f"[Redfin] Found {len(listings)} listings via GIS API")
-            return listings
+        # Try the GIS API first (most reliable). Its answer is
+        # authoritative: an empty list means no matching rentals exist,
+        # so the slower search-page scrape only runs when the API call
+        # itself failed (None).
+        api_listings = _scrape_via_gis_api()
+        if api_listings is not None:
+            log.info("[Redfin] Found %d listings via GIS API", len(api_listings))
+            return api_listings
 
         # Fallback to search page
         listings = _scrape_via_search_page()
         if listings:
-            print(f"[Redfin] Found {len(listings)} listings via search page")
+            log.info("[Redfin] Found %d listings via search page", len(listings))
             return listings
 
-        print("[Redfin] No listings found")
+        log.info("[Redfin] No listings found")
 
     except Exception as e:
-        print(f"[Redfin] Error: {e}")
+        log.error("[Redfin] Error: %s", e)
 
     return listings
 
 
-def _scrape_via_gis_api() -> List[Listing]:
-    """Use Redfin's GIS API to fetch listings."""
-    listings = []
-
-    # Build the API URL
+def _fetch_gis_page(page_number: int) -> Optional[List[dict]]:
+    """Fetch one page of GIS results, or None if the call failed."""
     # Redfin's stingray API endpoint
     params = {
         "al": 1,
@@ -76,7 +86,7 @@ def _scrape_via_gis_api() -> List[Listing]:
         "isRentals": "true",
         "num_homes": 100,
         "ord": "days-on-redfin-asc",
-        "page_number": 1,
+        "page_number": page_number,
         "region_id": ST_PETE_REGION_ID,
         "region_type": ST_PETE_REGION_TYPE,
         "sf": "1,2,5,6,7",  # Various filters
@@ -88,15 +98,41 @@ def _scrape_via_gis_api() -> List[Listing]:
     query_string = urllib.parse.urlencode(params)
     url = f"https://www.redfin.com/stingray/api/gis?{query_string}"
 
+    data = fetch_api(url, "Redfin", headers={"Referer": "https://www.redfin.com/"})
+    if not data:
+        return None
+    return data.get("homes", [])
+
+
+def _scrape_via_gis_api() -> Optional[List[Listing]]:
+    """
+    Use Redfin's GIS API to fetch listings.
+
+    Fetches GIS_PAGE_COUNT pages concurrently and merges the results.
+    Returns None when every page failed, so the caller can distinguish
+    "the API is down" (worth falling back) from "the API answered and
+    nothing matches" (an empty list).
+    """
+    listings: List[Listing] = []
+
     try:
-        data = _fetch_api(url)
-        if not data:
-            return listings
+        homes: List[dict] = []
+        any_ok = False
+        with ThreadPoolExecutor(max_workers=GIS_PAGE_COUNT) as executor:
+            pages = executor.map(_fetch_gis_page, range(1, GIS_PAGE_COUNT + 1))
+            for page_homes in pages:
+                if page_homes is None:
+                    continue
+                any_ok = True
+                homes.extend(page_homes)
 
-        # Parse the response
-        homes = data.get("homes", [])
+        if not any_ok:
+            return None
 
-        for home in homes:
+        # Parse the response. Pre-filtering on the raw dicts means the
+        # full Listing parse (address assembly, URL and photo resolution)
+        # only runs for homes that can actually pass the filters.
+        for home in _prefilter_homes(homes):
             listing = _parse_home(home)
             if listing:
                 # Apply our filters
@@ -107,44 +143,37 @@ def _scrape_via_gis_api() -> List[Listing]:
                 listings.append(listing)
 
     except Exception as e:
-        print(f"[Redfin] GIS API error: {e}")
+        log.warning("[Redfin] GIS API error: %s", e)
+        return None
 
     return listings
 
 
-def _fetch_api(url: str) -> Optional[dict]:
-    """Fetch from Redfin API and parse response."""
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "application/json",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Referer": "https://www.redfin.com/",
-    }
-
-    request = urllib.request.Request(url, headers=headers)
-
-    try:
-        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
-            content = response.read().decode("utf-8", errors="replace")
-
-            # Redfin API returns data with a prefix like "{}&&" that needs to be stripped
-            if content.startswith("{}&&"):
-                content = content[4:]
+def _prefilter_homes(homes: List[dict]) -> Iterator[dict]:
+    """
+    Yield homes that could pass the price/sqft filters, skipping parsing
+    for the rest.
 
-            return json.loads(content)
+    Reads only the two filter fields out of each raw API dict. Homes
+    whose fields are missing or unreadable are kept for _parse_home to
+    judge, so this can only skip work, never change the result.
+    """
+    for home in homes:
+        try:
+            price = to_int(home.get("priceInfo", {}).get("amount"))
+            if price is None:
+                price = to_int(home.get("price", {}).get("value"))
+            if price is not None and price > MAX_RENT:
+                continue
 
-    except urllib.error.HTTPError as e:
-        print(f"[Redfin] HTTP error {e.code}")
-        return None
-    except urllib.error.URLError as e:
-        print(f"[Redfin] URL error: {e.reason}")
-        return None
-    except json.JSONDecodeError as e:
-        print(f"[Redfin] JSON parse error: {e}")
-        return None
-    except Exception as e:
-        print(f"[Redfin] Fetch error: {e}")
-        return None
+            sqft = to_int(home.get("sqFt", {}).get("value"))
+            if sqft is None:
+                sqft = to_int(home.get("sqftInfo", {}).get("amount"))
+            if sqft is not None and sqft < MIN_SQFT:
+                continue
+        except Exception:
+            pass
+        yield home
 
 
 def _parse_home(home: dict) -> Optional[Listing]:
@@ -201,22 +230,14 @@ def _parse_home(home: dict) -> Optional[Listing]:
         if not photo_url:
             photo_url = home.get("primaryPhotoUrl")
 
-        return Listing(
-            address=street,
-            city=city,
-            state=state,
-            zip_code=str(zip_code),
-            price=int(price),
-            bedrooms=int(beds) if beds else None,
-            bathrooms=float(baths) if baths else None,
-            sqft=int(sqft) if sqft else None,
-            url=url,
-            source="redfin",
-            photo_url=photo_url
-        )
+        # Positional args in Listing field order; skips the per-call
+        # keyword matching in the hot parse loop
+        return Listing(street, city, state, str(zip_code), int(price),
+                       to_int(beds), to_float(baths), to_int(sqft),
+                       url, "redfin", photo_url)
 
     except Exception as e:
-        print(f"[Redfin] Parse error: {e}")
+        log.warning("[Redfin] Parse error: %s", e)
         return None
 
 
@@ -230,26 +251,18 @@ def _scrape_via_search_page() -> List[Listing]:
         "/filter/property-type=house,min-sqft=1500,max-price=7000"
     )
 
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-    }
-
-    request = urllib.request.Request(url, headers=headers)
-
     try:
-        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
-            html = response.read().decode("utf-8", errors="replace")
+        html = fetch_bytes(url, "Redfin")
+        if not html:
+            return listings
 
         # Try to find embedded JSON data
         # Redfin embeds data in script tags
-        script_pattern = r'<script[^>]*>window\.__reactServerState\s*=\s*(\{.*?\});</script>'
-        match = re.search(script_pattern, html, re.DOTALL)
+        blob = _extract_server_state(html)
 
-        if match:
+        if blob:
             try:
-                data = json.loads(match.group(1))
+                data = json_loads(blob)
                 homes = _extract_homes_from_state(data)
                 for home in homes:
                     listing = _parse_home(home)
@@ -264,65 +277,138 @@ def _scrape_via_search_page() -> List[Listing]:
 
         # HTML fallback
         if not listings:
-            listings = _parse_html_fallback(html)
+            listings = list(_parse_html_fallback(html))
 
     except Exception as e:
-        print(f"[Redfin] Search page error: {e}")
+        log.warning("[Redfin] Search page error: %s", e)
 
     return listings
 
 
+def _find_balanced_end(text: bytes, start: int) -> int:
+    """
+    Return the index just past the '}' matching the '{' at start, or -1.
+
+    Tracks JSON string and escape state, so braces inside string values
+    don't throw the count off. A DOTALL regex with a non-greedy body can
+    scan quadratically on a large page; this is a single linear pass.
+    Operates on bytes (indexing yields int codepoints).
+    """
+    quote, backslash, open_brace, close_brace = 0x22, 0x5C, 0x7B, 0x7D
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == backslash:
+                escaped = True
+            elif c == quote:
+                in_string = False
+        elif c == quote:
+            in_string = True
+        elif c == open_brace:
+            depth += 1
+        elif c == close_brace:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+
+def _extract_server_state(html: bytes) -> Optional[bytes]:
+    """Locate the window.__reactServerState JSON blob without regex."""
+    anchor = html.find(b'window.__reactServerState')
+    if anchor < 0:
+        return None
+    start = html.find(b'{', anchor)
+    if start < 0:
+        return None
+    end = _find_balanced_end(html, start)
+    if end < 0:
+        return None
+    return html[start:end]
+
+
 def _extract_homes_from_state(data: dict) -> List[dict]:
-    """Extract homes from Redfin's server state object."""
+    """
+    Extract homes from Redfin's server state object.
+
+    Probes the two shapes the data is known to take -- value.homes and
+    value.searchResults.homes -- with single .get lookups per value,
+    instead of membership tests followed by a second lookup under a
+    broad try/except.
+    """
     homes = []
 
-    try:
-        # Navigate the nested structure
-        for key, value in data.items():
-            if isinstance(value, dict):
-                if "homes" in value:
-                    homes.extend(value["homes"])
-                elif "searchResults" in value:
-                    results = value["searchResults"]
-                    if isinstance(results, dict) and "homes" in results:
-                        homes.extend(results["homes"])
-    except Exception:
-        pass
+    for value in data.values():
+        if not isinstance(value, dict):
+            continue
+        found = value.get("homes")
+        if found is None:
+            results = value.get("searchResults")
+            if isinstance(results, dict):
+                found = results.get("homes")
+        if found:
+            homes.extend(found)
 
     return homes
 
 
-def _parse_html_fallback(html: str) -> List[Listing]:
-    """Parse listings from HTML when API/JSON methods fail."""
-    listings = []
+# Marks the start of each home card in the fallback HTML
+_CARD_ANCHOR = b'HomeCard'
+
 
-    # Look for home cards
-    card_pattern = r'<div[^>]*class="[^"]*HomeCard[^"]*"[^>]*>(.*?)</div>\s*</div>\s*</div>'
-    cards = re.findall(card_pattern, html, re.DOTALL)
+def _iter_cards(html: bytes, limit: int = 20):
+    """
+    Yield a card-sized slice of the page for each home card anchor.
 
-    for card in cards[:20]:
+    Replaces a DOTALL regex over the whole page, which backtracks badly
+    on large inputs, with two linear find calls per card; the small
+    per-field regexes then run only on the slices.
+    """
+    pos = html.find(_CARD_ANCHOR)
+    count = 0
+    while pos >= 0 and count < limit:
+        nxt = html.find(_CARD_ANCHOR, pos + len(_CARD_ANCHOR))
+        end = nxt if nxt >= 0 else min(len(html), pos + 8192)
+        yield html[pos:end]
+        pos = nxt
+        count += 1
+
+
+def _parse_html_fallback(html: bytes) -> Iterator[Listing]:
+    """
+    Parse listings from HTML when API/JSON methods fail.
+
+    Yields listings as cards parse; the caller materializes at the
+    boundary.
+    """
+    for card in _iter_cards(html):
         try:
             # Extract address
-            addr_match = re.search(r'class="[^"]*homeAddress[^"]*"[^>]*>([^<]+)', card, re.IGNORECASE)
+            addr_match = _ADDR_RE.search(card)
             if not addr_match:
                 continue
 
-            address = addr_match.group(1).strip()
+            address = addr_match.group(1).decode("utf-8", errors="replace").strip()
 
             # Extract price
-            price_match = re.search(r'\$([0-9,]+)', card)
+            price_match = _PRICE_RE.search(card)
             if not price_match:
                 continue
 
-            price = int(price_match.group(1).replace(',', ''))
+            price = int(price_match.group(1).replace(b',', b''))
 
             # Check price filter
             if price > MAX_RENT:
                 continue
 
             # Extract URL
-            url_match = re.search(r'href="(/FL/[^"]+)"', card)
-            url = f"https://www.redfin.com{url_match.group(1)}" if url_match else ""
+            url_match = _URL_RE.search(card)
+            url = f"https://www.redfin.com{url_match.group(1).decode('ascii', errors='replace')}" if url_match else ""
 
             # Parse address (assume St Pete, FL)
             street = address
@@ -330,25 +416,12 @@ def _parse_html_fallback(html: str) -> List[Listing]:
             state = "FL"
             zip_code = ""
 
-            zip_match = re.search(r'(\d{5})', address)
+            zip_match = _ZIP_RE.search(address)
             if zip_match:
                 zip_code = zip_match.group(1)
 
-            listings.append(Listing(
-                address=street,
-                city=city,
-                state=state,
-                zip_code=zip_code,
-                price=price,
-                bedrooms=None,
-                bathrooms=None,
-                sqft=None,
-                url=url,
-                source="redfin",
-                photo_url=None
-            ))
+            yield Listing(street, city, state, zip_code, price,
+                          None, None, None, url, "redfin", None)
 
         except Exception:
             continue
-
-    return listings
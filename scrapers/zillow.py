@@ -3,354 +3,459 @@ Zillow scraper for rental listings.
 Uses embedded JSON data from search results page.
 """
 import json
+import logging
 import re
-import urllib.request
 import urllib.parse
-import urllib.error
-from typing import List, Optional
-
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from config import (
-    MIN_SQFT, MAX_RENT, USER_AGENT, REQUEST_TIMEOUT
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+from config import MIN_SQFT, MAX_RENT
+from models import Listing, to_float, to_int
+from scrapers.fetch import fetch_bytes, json_loads
+
+log = logging.getLogger(__name__)
+
+# Compiled once at import; these run against every fetched page (and every
+# card in the HTML fallback), so skip the re-cache lookup per call
+# One combined-address pattern shared by the JSON and HTML fallback
+# parsers; re.ASCII keeps \s and \d from consulting the Unicode tables
+_ADDR_FULL_RE = re.compile(
+    r'^(?P<street>.+?),\s*(?P<city>.+?),\s*(?P<state>[A-Z]{2})\s*(?P<zip>\d{5})?',
+    re.ASCII,
 )
-from models import Listing
+_PRICE_DIGITS_RE = re.compile(r'[\d,]+')
+# Deletes the decoration Zillow puts around prices ("$4,400+/mo") in one
+# C-level translate pass, so the common case never touches the regex
+_PRICE_STRIP_TBL = str.maketrans('', '', '$,+/mo ')
+# Bytes patterns: the page is scanned undecoded and only the matched
+# fragments are decoded
+_ADDR_TAG_RE = re.compile(rb'<address[^>]*>([^<]+)</address>')
+_CARD_PRICE_RE = re.compile(rb'\$([0-9,]+)(?:/mo|\/mo)?')
+_HOMEDETAILS_RE = re.compile(rb'href="(/homedetails/[^"]+)"')
+
+
+# Results pages fetched per scan. Fetched concurrently, so the extra
+# pages cost one round-trip, not three.
+PAGE_COUNT = 3
+
+# Zillow search state for St Pete rentals; the filters never change at
+# runtime, so the dict is built once here. Compact separators keep the
+# URL-encoded payload smaller than json.dumps defaults.
+_SEARCH_QUERY = {
+    "pagination": {},
+    "isMapVisible": False,
+    "filterState": {
+        "isForRent": {"value": True},
+        "isForSaleByAgent": {"value": False},
+        "isForSaleByOwner": {"value": False},
+        "isNewConstruction": {"value": False},
+        "isComingSoon": {"value": False},
+        "isAuction": {"value": False},
+        "isForSaleForeclosure": {"value": False},
+        "isAllHomes": {"value": True},
+        "monthlyPayment": {"max": MAX_RENT},
+        "sqft": {"min": MIN_SQFT},
+        "isApartmentOrCondo": {"value": False},
+        "isTownhouse": {"value": False},
+        "isManufactured": {"value": False},
+        "isApartment": {"value": False},
+        "isCondo": {"value": False},
+    },
+    "isListVisible": True,
+}
+
+_BASE_URL = "https://www.zillow.com/st-petersburg-fl/rentals/?searchQueryState="
+
+# Page 1 is fetched every scan and its query never varies; encode it once
+_PAGE1_URL = _BASE_URL + urllib.parse.quote(json.dumps(_SEARCH_QUERY, separators=(",", ":")))
 
 
 def scrape_zillow() -> List[Listing]:
     """
     Scrape rental listings from Zillow.
 
+    Fetches PAGE_COUNT results pages concurrently and merges them.
+
     Returns:
         List of Listing objects matching criteria
     """
     listings = []
 
-    # Zillow search URL for St Pete rentals
-    # Using their search state encoding for filters
-    search_query = {
-        "pagination": {},
-        "isMapVisible": False,
-        "filterState": {
-            "isForRent": {"value": True},
-            "isForSaleByAgent": {"value": False},
-            "isForSaleByOwner": {"value": False},
-            "isNewConstruction": {"value": False},
-            "isComingSoon": {"value": False},
-            "isAuction": {"value": False},
-            "isForSaleForeclosure": {"value": False},
-            "isAllHomes": {"value": True},
-            "monthlyPayment": {"max": MAX_RENT},
-            "sqft": {"min": MIN_SQFT},
-            "isApartmentOrCondo": {"value": False},
-            "isTownhouse": {"value": False},
-            "isManufactured": {"value": False},
-            "isApartment": {"value": False},
-            "isCondo": {"value": False},
-        },
-        "isListVisible": True,
-    }
-
-    encoded_query = urllib.parse.quote(json.dumps(search_query))
-    url = f"https://www.zillow.com/st-petersburg-fl/rentals/?searchQueryState={encoded_query}"
-
-    print(f"[Zillow] Fetching listings...")
+    log.info("[Zillow] Fetching listings...")
 
     try:
-        html = _fetch_page(url)
-        if not html:
-            print("[Zillow] Failed to fetch page")
-            return listings
-
-        # Try to extract listing data from various embedded JSON sources
-        data = _extract_listing_data(html)
-        if data:
-            listings = _parse_listings(data)
-            print(f"[Zillow] Found {len(listings)} listings")
-        else:
-            # Try HTML fallback
-            listings = _parse_html_fallback(html)
-            print(f"[Zillow] Found {len(listings)} listings via HTML fallback")
+        with ThreadPoolExecutor(max_workers=PAGE_COUNT) as executor:
+            for page_listings in executor.map(_scrape_page, range(1, PAGE_COUNT + 1)):
+                listings.extend(page_listings)
+
+        log.info("[Zillow] Found %d listings", len(listings))
 
     except Exception as e:
-        print(f"[Zillow] Error: {e}")
+        log.error("[Zillow] Error: %s", e)
 
     return listings
 
 
-def _fetch_page(url: str) -> Optional[str]:
-    """Fetch a page and return its HTML content."""
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Accept-Encoding": "gzip, deflate",
-        "DNT": "1",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-    }
+def _build_search_url(page: int) -> str:
+    """Build the search URL for one results page."""
+    if page == 1:
+        return _PAGE1_URL
+    # Later pages differ only in pagination; reuse the static filters
+    query = dict(_SEARCH_QUERY, pagination={"currentPage": page})
+    return _BASE_URL + urllib.parse.quote(json.dumps(query, separators=(",", ":")))
 
-    request = urllib.request.Request(url, headers=headers)
 
-    try:
-        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
-            # Handle gzip encoding
-            if response.info().get('Content-Encoding') == 'gzip':
-                import gzip
-                return gzip.decompress(response.read()).decode("utf-8", errors="replace")
-            return response.read().decode("utf-8", errors="replace")
-    except urllib.error.HTTPError as e:
-        print(f"[Zillow] HTTP error {e.code}")
-        return None
-    except urllib.error.URLError as e:
-        print(f"[Zillow] URL error: {e.reason}")
+# Zillow serves a challenge page to clients that look too spartan; these
+# ride on top of the shared defaults
+_EXTRA_HEADERS = {
+    "DNT": "1",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+
+def _scrape_page(page: int) -> List[Listing]:
+    """Fetch and parse one results page."""
+    html = fetch_bytes(_build_search_url(page), "Zillow", headers=_EXTRA_HEADERS)
+    if not html:
+        log.warning("[Zillow] Failed to fetch page %d", page)
+        return []
+
+    # Try to extract listing data from various embedded JSON sources
+    data = _extract_listing_data(html)
+    if data:
+        return _parse_listings(data)
+
+    # Try HTML fallback. The containment check skips walking every
+    # <article> on pages (error/challenge pages) with no cards at all.
+    if b'data-test="property-card"' not in html:
+        return []
+    return list(_parse_html_fallback(html))
+
+
+def _scan_balanced(text: bytes, start: int) -> int:
+    """
+    Return the index just past the bracket matching the one at start, or -1.
+
+    Handles both {} and [], tracking JSON string and escape state so
+    brackets inside string values don't throw the count off. A DOTALL
+    regex with a non-greedy body can scan quadratically on a large page;
+    this is a single linear pass. Operates on bytes (indexing yields int
+    codepoints; int membership in a bytes literal checks byte values).
+    """
+    quote, backslash = 0x22, 0x5C
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == backslash:
+                escaped = True
+            elif c == quote:
+                in_string = False
+        elif c == quote:
+            in_string = True
+        elif c in b'{[':
+            depth += 1
+        elif c in b'}]':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+
+def _slice_json(text: bytes, pos: int) -> Optional[bytes]:
+    """
+    Slice out the JSON object/array that starts at or just after pos.
+
+    Skips the ':' and whitespace that follow a key anchor, then uses the
+    balanced scanner to find the value's true end.
+    """
+    n = len(text)
+    while pos < n and text[pos] in b': \t\r\n':
+        pos += 1
+    if pos >= n or text[pos] not in b'{[':
         return None
-    except Exception as e:
-        print(f"[Zillow] Fetch error: {e}")
+    end = _scan_balanced(text, pos)
+    if end < 0:
         return None
+    return text[pos:end]
 
 
-def _extract_listing_data(html: str) -> Optional[List[dict]]:
-    """Extract listing data from embedded JSON in the page."""
+def _iter_json_values(html: bytes, key: bytes):
+    """Yield the JSON value sliced after each occurrence of a literal key."""
+    pos = html.find(key)
+    while pos >= 0:
+        blob = _slice_json(html, pos + len(key))
+        if blob is not None:
+            yield blob
+        pos = html.find(key, pos + len(key))
 
-    # Method 1: Look for __NEXT_DATA__ (Next.js apps)
-    next_data_pattern = r'<script id="__NEXT_DATA__"[^>]*>(.*?)</script>'
-    match = re.search(next_data_pattern, html, re.DOTALL)
-    if match:
+
+def _extract_listing_data(html: bytes) -> Optional[List[dict]]:
+    """Extract listing data from embedded JSON in the page."""
+    # The anchors are literal bytes, so plain find calls (memchr-fast,
+    # no regex machinery) locate every candidate blob; the balanced
+    # scanner then slices the exact value. json_loads takes the raw
+    # slices, so nothing is decoded wholesale. Method priority is
+    # unchanged.
+
+    # Method 1: __NEXT_DATA__ (Next.js apps)
+    i = html.find(b'<script id="__NEXT_DATA__"')
+    if i >= 0:
+        j = html.find(b'>', i)
+        end = html.find(b'</script>', j)
+        if j >= 0 and end >= 0:
+            blob = html[j + 1:end]
+            # A containment check is far cheaper than parsing a
+            # multi-megabyte blob that can't hold results anyway
+            if b'"listResults"' in blob:
+                try:
+                    results = _extract_from_next_data(json_loads(blob))
+                    if results:
+                        return results
+                except json.JSONDecodeError:
+                    pass
+
+    # Method 2: inline listResults arrays (any nesting; the balanced
+    # scan extracts the full array regardless of surrounding context)
+    for blob in _iter_json_values(html, b'"listResults"'):
         try:
-            data = json.loads(match.group(1))
-            results = _extract_from_next_data(data)
-            if results:
-                return results
+            data = json_loads(blob)
         except json.JSONDecodeError:
-            pass
-
-    # Method 2: Look for inline JSON with listing data
-    # Zillow often embeds data in script tags
-    patterns = [
-        r'"listResults"\s*:\s*(\[.*?\])\s*,\s*"',
-        r'"searchResults"\s*:\s*\{\s*"listResults"\s*:\s*(\[.*?\])',
-        r'"cat1"\s*:\s*\{\s*"searchResults"\s*:\s*\{\s*"listResults"\s*:\s*(\[.*?\])',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, html, re.DOTALL)
-        if match:
-            try:
-                # This might be truncated, try to parse what we can
-                json_str = match.group(1)
-                # Find the proper end of the array
-                data = json.loads(json_str)
-                if isinstance(data, list) and len(data) > 0:
-                    return data
-            except json.JSONDecodeError:
-                continue
+            continue
+        if isinstance(data, list) and len(data) > 0:
+            return data
 
-    # Method 3: Look for gdpClientCache or similar
-    cache_pattern = r'"gdpClientCache"\s*:\s*(\{.*?\})\s*,\s*"'
-    match = re.search(cache_pattern, html, re.DOTALL)
-    if match:
+    # Method 3: gdpClientCache or similar
+    for blob in _iter_json_values(html, b'"gdpClientCache"'):
         try:
-            cache = json.loads(match.group(1))
-            results = []
-            for key, value in cache.items():
-                if isinstance(value, dict) and "property" in value:
-                    results.append(value["property"])
-            if results:
-                return results
+            cache = json_loads(blob)
         except json.JSONDecodeError:
-            pass
+            continue
+        results = []
+        for key, value in cache.items():
+            if isinstance(value, dict) and "property" in value:
+                results.append(value["property"])
+        if results:
+            return results
 
     return None
 
 
 def _extract_from_next_data(data: dict) -> Optional[List[dict]]:
     """Extract listings from __NEXT_DATA__ structure."""
+    # Direct subscripting per known path: no fallback-dict allocation at
+    # every level, and a miss costs one exception instead of walking the
+    # rest of the chain on empty dicts.
     try:
-        props = data.get("props", {})
-        page_props = props.get("pageProps", {})
-
-        # Try different paths
-        search_page_state = page_props.get("searchPageState", {})
-        cat1 = search_page_state.get("cat1", {})
-        search_results = cat1.get("searchResults", {})
-        list_results = search_results.get("listResults", [])
-
-        if list_results:
-            return list_results
-
-        # Alternative path
-        initial_data = page_props.get("initialData", {})
-        if "searchResults" in initial_data:
-            return initial_data["searchResults"].get("listResults", [])
+        results = data["props"]["pageProps"]["searchPageState"]["cat1"][
+            "searchResults"]["listResults"]
+        if results:
+            return results
+    except (KeyError, TypeError):
+        pass
 
-    except Exception:
+    # Alternative path
+    try:
+        return data["props"]["pageProps"]["initialData"]["searchResults"][
+            "listResults"]
+    except (KeyError, TypeError):
         pass
 
     return None
 
 
+# Below this many items the pool's startup cost outweighs the win and
+# parsing stays serial; above it, items are parsed CPU-parallel in
+# chunks big enough to amortize the pickling round-trips.
+_PARALLEL_PARSE_THRESHOLD = 64
+_PARSE_CHUNKSIZE = 32
+
+
 def _parse_listings(data: List[dict]) -> List[Listing]:
     """Parse listing data into Listing objects."""
-    listings = []
-
+    # Zillow repeats entries within a blob (map pins alongside list
+    # results, boosted listings); drop repeats by zpid up front so each
+    # home is parsed once. Items without a zpid are kept as-is.
+    seen = set()
+    items = []
     for item in data:
-        listing = _parse_single_listing(item)
-        if listing:
-            listings.append(listing)
+        zpid = item.get("zpid")
+        if zpid is not None:
+            if zpid in seen:
+                continue
+            seen.add(zpid)
+        items.append(item)
+
+    if len(items) >= _PARALLEL_PARSE_THRESHOLD:
+        try:
+            with ProcessPoolExecutor() as executor:
+                parsed = executor.map(_parse_single_listing, items,
+                                      chunksize=_PARSE_CHUNKSIZE)
+                return [listing for listing in parsed if listing]
+        except Exception as e:
+            # Pool trouble (spawn limits, pickling) degrades to serial
+            log.warning("[Zillow] Parallel parse failed, going serial: %s", e)
+
+    return [listing for listing in map(_parse_single_listing, items) if listing]
 
-    return listings
+
+def _split_address(address: str):
+    """
+    Split a combined 'street, city, ST zip' string into components.
+
+    Shared by the JSON and HTML fallback parsers; anything that doesn't
+    match the full pattern keeps its leading comma-part as the street
+    and the St Pete defaults.
+    """
+    match = _ADDR_FULL_RE.match(address)
+    if match:
+        return (match['street'], match['city'], match['state'],
+                match['zip'] or "")
+    street = address.split(',', 1)[0].strip()
+    return street or address, "St Petersburg", "FL", ""
 
 
 def _parse_single_listing(item: dict) -> Optional[Listing]:
     """Parse a single listing from Zillow data."""
+    # Bound-method lookup once instead of an attribute lookup per field;
+    # this function runs for every item on every page.
+    g = item.get
     try:
         # Get address components
-        address = item.get("address", "")
+        address = g("address")
         if not address:
-            address_data = item.get("hdpData", {}).get("homeInfo", {})
-            street = address_data.get("streetAddress", "")
-            city = address_data.get("city", "St Petersburg")
-            state = address_data.get("state", "FL")
-            zip_code = address_data.get("zipcode", "")
+            hdp = g("hdpData")
+            home_info = hdp.get("homeInfo") if isinstance(hdp, dict) else None
+            if home_info:
+                street = home_info.get("streetAddress", "")
+                city = home_info.get("city", "St Petersburg")
+                state = home_info.get("state", "FL")
+                zip_code = home_info.get("zipcode", "")
+            else:
+                return None
         else:
             # Parse from combined address string
-            street = address
-            city = "St Petersburg"
-            state = "FL"
-            zip_code = ""
-
-            # Try to extract city/state/zip
-            match = re.match(r'^(.+?),\s*(.+?),\s*([A-Z]{2})\s*(\d{5})?', address)
-            if match:
-                street = match.group(1)
-                city = match.group(2)
-                state = match.group(3)
-                zip_code = match.group(4) or ""
+            street, city, state, zip_code = _split_address(address)
 
         if not street:
             return None
 
         # Get price - handle various formats like "$4,400/mo", "4400", etc.
-        price = item.get("unformattedPrice")
+        price = g("unformattedPrice")
         if not price:
-            price_raw = item.get("price")
+            price_raw = g("price")
             if isinstance(price_raw, (int, float)):
                 price = int(price_raw)
             elif isinstance(price_raw, str):
                 # Extract digits from strings like "$4,400/mo"
-                match = re.search(r'[\d,]+', price_raw.replace(',', ''))
-                if match:
-                    price = int(match.group().replace(',', ''))
+                digits = price_raw.translate(_PRICE_STRIP_TBL)
+                if digits.isdigit():
+                    price = int(digits)
+                else:
+                    # Unexpected decoration; fall back to the digit regex
+                    match = _PRICE_DIGITS_RE.search(digits)
+                    if match:
+                        price = int(match.group())
 
         if not price:
             return None
 
         # Get details
-        beds = item.get("beds")
-        baths = item.get("baths")
-        sqft = item.get("area")
+        beds = g("beds")
+        baths = g("baths")
+        sqft = g("area")
 
         if not sqft:
-            sqft = item.get("livingArea")
+            sqft = g("livingArea")
 
         # Get URL
-        detail_url = item.get("detailUrl", "")
+        detail_url = g("detailUrl", "")
         if detail_url and not detail_url.startswith("http"):
             detail_url = f"https://www.zillow.com{detail_url}"
 
-        zpid = item.get("zpid")
+        zpid = g("zpid")
         if not detail_url and zpid:
             detail_url = f"https://www.zillow.com/homedetails/{zpid}_zpid/"
 
         # Get photo
-        photo_url = item.get("imgSrc")
+        photo_url = g("imgSrc")
         if not photo_url:
-            photos = item.get("carouselPhotos", [])
+            photos = g("carouselPhotos")
             if photos:
                 photo_url = photos[0].get("url")
 
-        return Listing(
-            address=street,
-            city=city,
-            state=state,
-            zip_code=str(zip_code),
-            price=int(price),
-            bedrooms=int(beds) if beds else None,
-            bathrooms=float(baths) if baths else None,
-            sqft=int(sqft) if sqft else None,
-            url=detail_url,
-            source="zillow",
-            photo_url=photo_url
-        )
+        # Positional args in Listing field order; skips the per-call
+        # keyword matching in the hot parse loop
+        return Listing(street, city, state, str(zip_code), int(price),
+                       to_int(beds), to_float(baths), to_int(sqft),
+                       detail_url, "zillow", photo_url)
 
     except Exception as e:
-        print(f"[Zillow] Parse error: {e}")
+        log.warning("[Zillow] Parse error: %s", e)
         return None
 
 
-def _parse_html_fallback(html: str) -> List[Listing]:
+def _iter_cards(html: bytes, limit: int = 20):
     """
-    Fallback HTML parser when JSON extraction fails.
+    Yield the contents of each property-card <article> on the page.
+
+    Walks the page with linear find calls instead of a DOTALL regex that
+    backtracks badly on large inputs; the compiled per-field regexes
+    then run only on the small card slices.
     """
-    listings = []
+    pos = 0
+    count = 0
+    while count < limit:
+        start = html.find(b'<article', pos)
+        if start < 0:
+            return
+        end = html.find(b'</article>', start)
+        if end < 0:
+            return
+        card = html[start:end]
+        pos = end + len(b'</article>')
+        # Only cards marked as property cards in the opening tag count
+        tag_end = card.find(b'>')
+        if tag_end < 0 or b'data-test="property-card"' not in card[:tag_end]:
+            continue
+        yield card[tag_end + 1:]
+        count += 1
 
-    # Look for property cards
-    card_pattern = r'<article[^>]*data-test="property-card"[^>]*>(.*?)</article>'
-    cards = re.findall(card_pattern, html, re.DOTALL)
 
-    for card in cards[:20]:
+def _parse_html_fallback(html: bytes) -> Iterator[Listing]:
+    """
+    Fallback HTML parser when JSON extraction fails. Yields listings
+    as cards parse; the caller materializes at the boundary.
+    """
+    for card in _iter_cards(html):
         try:
             # Extract address
-            addr_match = re.search(r'<address[^>]*>([^<]+)</address>', card)
+            addr_match = _ADDR_TAG_RE.search(card)
             if not addr_match:
                 continue
 
-            address = addr_match.group(1).strip()
+            address = addr_match.group(1).decode("utf-8", errors="replace").strip()
 
             # Extract price
-            price_match = re.search(r'\$([0-9,]+)(?:/mo|\/mo)?', card)
+            price_match = _CARD_PRICE_RE.search(card)
             if not price_match:
                 continue
 
-            price = int(price_match.group(1).replace(',', ''))
+            price = int(price_match.group(1).replace(b',', b''))
 
             # Extract URL
-            url_match = re.search(r'href="(/homedetails/[^"]+)"', card)
-            url = f"https://www.zillow.com{url_match.group(1)}" if url_match else ""
+            url_match = _HOMEDETAILS_RE.search(card)
+            url = f"https://www.zillow.com{url_match.group(1).decode('ascii', errors='replace')}" if url_match else ""
 
             # Parse address
-            parts = address.split(',')
-            street = parts[0].strip()
-            city = "St Petersburg"
-            state = "FL"
-            zip_code = ""
-
-            if len(parts) >= 3:
-                city = parts[1].strip()
-                state_zip = parts[2].strip()
-                match = re.match(r'([A-Z]{2})\s*(\d{5})?', state_zip)
-                if match:
-                    state = match.group(1)
-                    zip_code = match.group(2) or ""
-
-            listings.append(Listing(
-                address=street,
-                city=city,
-                state=state,
-                zip_code=zip_code,
-                price=price,
-                bedrooms=None,
-                bathrooms=None,
-                sqft=None,
-                url=url,
-                source="zillow",
-                photo_url=None
-            ))
+            street, city, state, zip_code = _split_address(address)
+
+            yield Listing(street, city, state, zip_code, price,
+                          None, None, None, url, "zillow", None)
 
         except Exception:
             continue
-
-    return listings